@@ -1,19 +1,38 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 from dotenv import load_dotenv
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+import hashlib
+import io
 import json
+import orjson
+import secrets
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from types import SimpleNamespace
+from cachetools import LRUCache, TTLCache
 from database import db, init_db, User, Resource, Transaction
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.pool import NullPool
+from firebase_auth import verify_id_token_cached
 from urllib.parse import quote_plus
 import boto3
-from werkzeug.utils import secure_filename
-import uuid
+from boto3.exceptions import S3UploadFailedError
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from werkzeug.exceptions import RequestEntityTooLarge
+from PIL import Image, ImageOps
 import firebase_admin
-from firebase_admin import credentials, auth
+from firebase_admin import credentials
 
 # Load environment variables
 load_dotenv()
@@ -40,7 +59,25 @@ except ValueError:
         if os.environ.get('VERCEL'):
             raise
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Serialize jsonify() responses and parse request bodies with orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 application = Flask(__name__)
+application.json = ORJSONProvider(application)
+
+def ojsonify(obj, status=200):
+    """Like jsonify(), but hands orjson's bytes straight to the response"""
+    return application.response_class(
+        orjson.dumps(obj, default=application.json.default, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype='application/json'
+    )
 
 # Security configuration
 if os.environ.get('VERCEL') or os.environ.get('PRODUCTION'):
@@ -52,9 +89,12 @@ if os.environ.get('VERCEL') or os.environ.get('PRODUCTION'):
     application.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
     application.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=1)
     application.config['SESSION_COOKIE_NAME'] = '__Host-session'  # Secure naming
+    # Per-request debug/info logging is skipped entirely in production
+    application.logger.setLevel(os.getenv('LOG_LEVEL', 'WARNING').upper())
 else:
     # Development settings
     application.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or 'dev-secret-change-me'
+    application.logger.setLevel(os.getenv('LOG_LEVEL', 'DEBUG').upper())
     print("⚠️ Using development secret key. Do not use in production!")
 db_url = os.getenv('DATABASE_URL')
 if not db_url:
@@ -65,22 +105,47 @@ if not db_url:
     db_port = os.getenv('DB_PORT', '3306')
     if all([db_user, db_password, db_host, db_name]):
         safe_password = quote_plus(db_password)
-        # Add connection pooling and retry parameters
-        params = {
-            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
-            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
-            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
-            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),  # 30 minutes
-            'pool_pre_ping': True  # Enable connection health checks
-        }
-        param_str = '&'.join(f'{k}={v}' for k, v in params.items())
-        db_url = f"mysql+pymysql://{db_user}:{safe_password}@{db_host}:{db_port}/{db_name}?{param_str}"
+        db_url = f"mysql+pymysql://{db_user}:{safe_password}@{db_host}:{db_port}/{db_name}"
 if not db_url:
     raise ValueError("DATABASE_URL environment variable is not set. Please provide a valid MySQL connection string.")
 application.config['SQLALCHEMY_DATABASE_URI'] = db_url
 application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if db_url.startswith('mysql'):
+    mysql_connect_args = {
+        'charset': 'utf8mb4',
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        # Column defaults use CURRENT_TIMESTAMP, which follows the session zone
+        'init_command': "SET time_zone = '+00:00'"
+    }
+    # Pool settings must go to create_engine(); in the URL query string they
+    # would be handed to the driver instead
+    if os.environ.get('VERCEL'):
+        # Serverless instances are frozen between invocations, so pooled
+        # sockets would only go stale; open one connection per request
+        application.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'poolclass': NullPool,
+            'connect_args': mysql_connect_args
+        }
+    else:
+        default_pool_size = min(2 * (os.cpu_count() or 1), 25)
+        application.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', default_pool_size)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '40')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '5')),
+            # Recycle well inside MySQL's wait_timeout instead of pinging on
+            # every checkout
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '280')),
+            'pool_pre_ping': False,
+            'connect_args': mysql_connect_args
+        }
 application.config['UPLOAD_FOLDER'] = 'static/uploads'
 application.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+application.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'application/javascript']
+application.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+application.config['COMPRESS_MIN_SIZE'] = 500  # Small responses aren't worth compressing
+
+# Compress JSON and page responses for clients that accept it
+Compress(application)
 
 # Configure CORS
 if os.environ.get('VERCEL') or os.environ.get('PRODUCTION'):
@@ -105,26 +170,277 @@ if os.getenv('AWS_ACCESS_KEY_ID'):
             's3',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION')
+            region_name=os.getenv('AWS_REGION'),
+            # Keep connections to S3 alive between uploads and address the
+            # bucket in its own region so requests aren't redirected
+            config=Config(
+                region_name=os.getenv('AWS_REGION'),
+                tcp_keepalive=True,
+                max_pool_connections=50,
+                retries={'max_attempts': 3, 'mode': 'adaptive'},
+                s3={'addressing_style': 'virtual'}
+            )
         )
-        # Test S3 connection and bucket access
-        s3_client.head_bucket(Bucket=os.getenv('S3_BUCKET'))
-        print("✅ S3 connection and bucket access verified")
     except Exception as e:
         print(f"❌ S3 initialization failed: {e}")
         # On Vercel, we need S3 working
         if os.environ.get('VERCEL'):
             raise Exception("S3 configuration required for Vercel deployment")
 
+def check_s3_bucket():
+    """Log whether the bucket is reachable, off the startup path"""
+    try:
+        s3_client.head_bucket(Bucket=os.getenv('S3_BUCKET'))
+        print("✅ S3 connection and bucket access verified")
+    except Exception as e:
+        print(f"❌ S3 bucket check failed: {e}")
+
+if s3_client:
+    threading.Thread(target=check_s3_bucket, daemon=True).start()
+
+# Uploads to S3 that run after the response has been sent
+s3_upload_executor = ThreadPoolExecutor(max_workers=4)
+
+def s3_object_url(bucket, key):
+    return f"https://{bucket}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{key}"
+
+def s3_object_exists(bucket, key):
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+# Attempts per background upload; rows whose upload still fails keep the
+# local URL and are picked up again by the sweep below
+S3_UPLOAD_ATTEMPTS = 3
+LOCAL_UPLOAD_SWEEP_INTERVAL = 600  # 10 minutes
+
+def upload_image_to_s3(filepath, key):
+    """Upload a locally saved image to S3 and point the resources using it at the S3 copy"""
+    bucket = os.getenv('S3_BUCKET')
+    for attempt in range(S3_UPLOAD_ATTEMPTS):
+        try:
+            # Keys are content hashes, so an existing object is the same image
+            if not s3_object_exists(bucket, key):
+                with open(filepath, 'rb') as f:
+                    s3_client.upload_fileobj(
+                        f,
+                        bucket,
+                        key,
+                        ExtraArgs={
+                            'ContentType': 'image/webp',
+                            'CacheControl': 'max-age=31536000'  # 1 year cache
+                        }
+                    )
+            break
+        except FileNotFoundError:
+            # Another upload of the same image finished first and removed the local copy
+            break
+        except Exception as e:
+            if attempt == S3_UPLOAD_ATTEMPTS - 1:
+                # The resources keep serving the local copy until the next sweep
+                application.logger.error("❌ Background S3 upload of %s failed: %s", key, e)
+                return
+            time.sleep(2 ** attempt)
+    
+    with application.app_context():
+        try:
+            Resource.query.filter_by(image_url=f"/static/uploads/{key}").update({'image_url': s3_object_url(bucket, key)})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            application.logger.error("❌ Failed to update image URL for %s: %s", key, e)
+            return
+    application.logger.info("✅ Image uploaded to S3 in background: %s", key)
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+
+def sweep_local_uploads():
+    """Queue uploads for images that resources still serve from this instance's disk"""
+    try:
+        # Only files named by create_resource; the rest ship with the app
+        keys = [
+            name for name in os.listdir(application.config['UPLOAD_FOLDER'])
+            if name.endswith('.webp') and len(name) == 37
+            and all(char in '0123456789abcdef' for char in name[:32])
+        ]
+    except FileNotFoundError:
+        return
+    if not keys:
+        return
+    with application.app_context():
+        local_urls = db.session.execute(
+            db.select(Resource.image_url)
+            .where(Resource.image_url.in_([f"/static/uploads/{key}" for key in keys]))
+            .distinct()
+        ).scalars().all()
+    for url in local_urls:
+        key = url.rsplit('/', 1)[1]
+        s3_upload_executor.submit(upload_image_to_s3, os.path.join(application.config['UPLOAD_FOLDER'], key), key)
+
+def sweep_local_uploads_periodically():
+    """Re-upload images whose background upload failed or was lost with a recycled worker"""
+    while True:
+        try:
+            sweep_local_uploads()
+        except Exception as e:
+            application.logger.error("❌ Local upload sweep failed: %s", e)
+        time.sleep(LOCAL_UPLOAD_SWEEP_INTERVAL)
+
+# Serverless instances have no local uploads to sweep
+if s3_client and not os.environ.get('VERCEL'):
+    threading.Thread(target=sweep_local_uploads_periodically, daemon=True).start()
+
 # Weather API Configuration
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 WEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
 
+# Shared session so calls to OpenWeatherMap reuse keep-alive connections
+weather_session = requests.Session()
+weather_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+
+# Weather changes on ~10 minute timescales and many users share a location,
+# so upstream responses are cached in-process. Forecasts are refreshed upstream
+# every 3 hours.
+weather_cache = TTLCache(maxsize=10000, ttl=600)
+forecast_cache = TTLCache(maxsize=10000, ttl=3 * 60 * 60)
+weather_cache_lock = threading.Lock()
+
+def weather_cache_key(lat=None, lon=None, city=None):
+    """Build a cache key from coordinates rounded to ~1km, or the city name"""
+    if lat and lon:
+        try:
+            return f"{round(float(lat), 2)}:{round(float(lon), 2)}"
+        except ValueError:
+            return None
+    if city:
+        return f"city:{city.strip().lower()}"
+    return None
+
 # Allowed file extensions
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+ALLOWED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+# Leading bytes of the accepted image formats (WebP is checked separately)
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# Uploaded images are downscaled to fit this box and stored as WebP
+IMAGE_MAX_SIZE = (1024, 1024)
+
+def make_web_image(stream):
+    """Downscale an uploaded image and re-encode it as WebP, returning a BytesIO"""
+    with Image.open(stream) as img:
+        img.thumbnail(IMAGE_MAX_SIZE, Image.Resampling.LANCZOS)
+        # Apply the camera's EXIF rotation, which is dropped on re-encode
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        output = io.BytesIO()
+        img.save(output, 'WEBP', quality=82, method=4)
+    output.seek(0)
+    return output
+
+def sniff_image_type(stream):
+    """Return the image MIME type from the stream's magic bytes, or None"""
+    header = stream.read(12)
+    stream.seek(0)
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    return None
+
+# URLs of files under static/, rescanned periodically instead of stat'ing per row
+STATIC_LISTING_TTL = 30
+static_listing = {'loaded_at': 0.0, 'files': set()}
+
+def static_files():
+    """Set of '/static/...' URLs on disk, at most STATIC_LISTING_TTL seconds old"""
+    now = time.monotonic()
+    if now - static_listing['loaded_at'] > STATIC_LISTING_TTL:
+        files = set()
+        for dirpath, _, filenames in os.walk(os.path.join(application.root_path, 'static')):
+            url_dir = '/' + os.path.relpath(dirpath, application.root_path).replace(os.sep, '/')
+            files.update(f"{url_dir}/{name}" for name in filenames)
+        static_listing['files'] = files
+        static_listing['loaded_at'] = now
+    return static_listing['files']
+
+def resolve_image_url(image_url):
+    """Image URL to serve, with the placeholder for missing or absent local images"""
+    if not image_url or not isinstance(image_url, str) or not image_url.strip():
+        return '/static/images/placeholder.svg'
+    # S3 URLs are served as stored; local files must still be on disk
+    if image_url.startswith('/static/') and image_url not in static_files():
+        return '/static/images/placeholder.svg'
+    return image_url
+
+# Read-only snapshots of user rows, shared across requests for a short time
+user_cache = TTLCache(maxsize=5000, ttl=60)
+user_cache_lock = threading.Lock()
+USER_FIELDS = ('id', 'firebase_uid', 'email', 'name', 'phone', 'location',
+               'language_preference', 'created_at', 'updated_at')
+
+def get_user(user_id):
+    """Read-only snapshot of a user row, cached on g and across requests"""
+    user = g.get('user')
+    if user is not None and user.id == user_id:
+        return user
+    with user_cache_lock:
+        user = user_cache.get(user_id)
+    if user is None:
+        row = db.session.get(User, user_id)
+        if row is None:
+            return None
+        user = SimpleNamespace(**{field: getattr(row, field) for field in USER_FIELDS})
+        with user_cache_lock:
+            user_cache[user_id] = user
+    g.user = user
+    return user
+
+def forget_user(user_id):
+    """Drop a cached user snapshot after the row changes"""
+    with user_cache_lock:
+        user_cache.pop(user_id, None)
+    g.pop('user', None)
+
+def remember_user(user):
+    """Log the user in and keep the fields page templates need in the session"""
+    session['user_id'] = user.id
+    session['user_name'] = user.name
+    session['user_email'] = user.email
+    # Login and profile edits may have changed the row
+    forget_user(user.id)
+
+def session_user():
+    """Lightweight identity of the logged-in user, read from the session cookie"""
+    if 'user_id' not in session:
+        return None
+    if 'user_name' not in session or 'user_email' not in session:
+        # Sessions created before the identity was stored in the cookie
+        user = get_user(session['user_id'])
+        if not user:
+            return None
+        remember_user(user)
+    return SimpleNamespace(id=session['user_id'], name=session['user_name'], email=session['user_email'])
 
 def login_required(f):
     @wraps(f)
@@ -141,7 +457,7 @@ def login_required(f):
             try:
                 # Verify the token with Firebase
                 id_token = auth_header.split('Bearer ')[1]
-                decoded_token = auth.verify_id_token(id_token)
+                decoded_token = verify_id_token_cached(id_token)
                 firebase_uid = decoded_token['uid']
                 
                 # Find user by Firebase UID
@@ -152,7 +468,7 @@ def login_required(f):
                     return redirect(url_for('login', next=request.url))
                 
                 # Set session
-                session['user_id'] = user.id
+                remember_user(user)
             except Exception as e:
                 if request.is_json or request.path.startswith('/api/'):
                     return jsonify({'success': False, 'message': 'Invalid authentication token'}), 401
@@ -164,6 +480,33 @@ def login_required(f):
 # Create upload folder if it doesn't exist
 os.makedirs(application.config['UPLOAD_FOLDER'], exist_ok=True)
 
+@application.after_request
+def commit_session(response):
+    """Commit the request's pending writes once, or roll them back on an error response"""
+    # Handlers that need the row committed before they return still commit
+    # themselves: register and api_login (the user goes into the session and
+    # user cache), create_resource (the background upload updates the row) and
+    # update_profile (the cached user is dropped after the write is visible)
+    if response.status_code >= 400:
+        db.session.rollback()
+        return response
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        application.logger.error("❌ Commit failed: %s", e)
+        # after_request hooks must return a response object, not a view tuple
+        return ojsonify({'success': False, 'message': str(e)}, 500)
+    return response
+
+@application.errorhandler(RequestEntityTooLarge)
+def request_entity_too_large(e):
+    # Raised from the Content-Length header before the multipart body is parsed
+    return jsonify({
+        'success': False,
+        'message': f'File too large. Maximum size is {application.config["MAX_CONTENT_LENGTH"] / (1024 * 1024)}MB'
+    }), 413
+
 @application.route('/')
 def index():
     # Allow browsing without login, redirect to marketplace
@@ -183,35 +526,26 @@ def signup():
 
 @application.route('/dashboard')
 def dashboard():
-    user = None
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-    return render_template('dashboard.html', user=user)
+    return render_template('dashboard.html', user=session_user())
 
 @application.route('/marketplace')
 def marketplace():
-    user = None
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-    return render_template('marketplace.html', user=user)
+    return render_template('marketplace.html', user=session_user())
 
 @application.route('/add-resource')
 @login_required
 def add_resource():
-    user = User.query.get(session['user_id'])
-    return render_template('add_resource.html', user=user)
+    return render_template('add_resource.html', user=session_user())
 
 @application.route('/my-resources')
 @login_required
 def my_resources():
-    user = User.query.get(session['user_id'])
-    return render_template('my_resources.html', user=user)
+    return render_template('my_resources.html', user=session_user())
 
 @application.route('/profile')
 @login_required
 def profile():
-    user = User.query.get(session['user_id'])
-    return render_template('profile.html', user=user)
+    return render_template('profile.html', user=get_user(session['user_id']))
 
 # API Routes
 
@@ -232,7 +566,7 @@ def register():
                 firebase_uid = id_token  # Use token directly as UID in dev mode
             else:
                 # In production, always verify tokens
-                decoded_token = auth.verify_id_token(id_token)
+                decoded_token = verify_id_token_cached(id_token)
                 firebase_uid = decoded_token['uid']
         except Exception as e:
             return jsonify({'success': False, 'message': 'Invalid ID token'}), 401
@@ -244,7 +578,7 @@ def register():
             if existing_user.firebase_uid != firebase_uid:
                 existing_user.firebase_uid = firebase_uid
                 db.session.commit()
-            session['user_id'] = existing_user.id
+            remember_user(existing_user)
             return jsonify({
                 'success': True,
                 'message': 'User already exists, updated Firebase UID',
@@ -268,7 +602,7 @@ def register():
         db.session.add(user)
         db.session.commit()
         
-        session['user_id'] = user.id
+        remember_user(user)
         
         return jsonify({
             'success': True,
@@ -311,11 +645,11 @@ def api_login():
                 app.logger.debug('Development mode: Using token as UID')
             else:
                 # In production, always verify tokens
-                decoded_token = auth.verify_id_token(id_token)
+                decoded_token = verify_id_token_cached(id_token)
                 firebase_uid = decoded_token['uid']
-                app.logger.debug(f'Production mode: Verified token for UID {firebase_uid}')
+                app.logger.debug('Production mode: Verified token for UID %s', firebase_uid)
         except Exception as e:
-            app.logger.error(f'Token verification error: {str(e)}')
+            app.logger.error('Token verification error: %s', e)
             return jsonify({
                 'success': False,
                 'message': 'Invalid authentication token',
@@ -338,9 +672,9 @@ def api_login():
             try:
                 user.firebase_uid = firebase_uid
                 db.session.commit()
-                app.logger.info(f'Updated Firebase UID for user {user.id}')
+                app.logger.info('Updated Firebase UID for user %s', user.id)
             except Exception as e:
-                app.logger.error(f'Failed to update Firebase UID: {str(e)}')
+                app.logger.error('Failed to update Firebase UID: %s', e)
                 db.session.rollback()
                 return jsonify({
                     'success': False,
@@ -348,7 +682,7 @@ def api_login():
                     'error': 'DATABASE_ERROR'
                 }), 500
         
-        session['user_id'] = user.id
+        remember_user(user)
         
         return jsonify({
             'success': True,
@@ -364,7 +698,7 @@ def api_login():
             }
         })
     except Exception as e:
-        app.logger.error(f'Login error: {str(e)}')
+        app.logger.error('Login error: %s', e)
         return jsonify({
             'success': False,
             'message': 'An error occurred during login',
@@ -374,6 +708,8 @@ def api_login():
 @application.route('/api/auth/logout', methods=['POST'])
 def logout():
     session.pop('user_id', None)
+    session.pop('user_name', None)
+    session.pop('user_email', None)
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
 @application.route('/api/config/firebase')
@@ -390,19 +726,83 @@ def firebase_config():
         # Verify all required fields are present
         if not all(config.values()):
             missing = [k for k, v in config.items() if not v]
-            app.logger.error(f'Missing Firebase config values: {missing}')
+            app.logger.error('Missing Firebase config values: %s', missing)
             return jsonify({
                 'success': False,
                 'message': 'Firebase configuration is incomplete'
             }), 500
         return jsonify({'success': True, 'config': config})
     except Exception as e:
-        app.logger.error(f'Error getting Firebase config: {str(e)}')
+        app.logger.error('Error getting Firebase config: %s', e)
         return jsonify({
             'success': False,
             'message': 'Failed to load Firebase configuration'
         }), 500
 
+# Lets /api/weather/full wait on both upstream calls at once
+weather_executor = ThreadPoolExecutor(max_workers=8)
+
+def fetch_current_weather(lat=None, lon=None, city=None):
+    """Current conditions from OpenWeatherMap or the cache; returns (data, error)"""
+    cache_key = weather_cache_key(lat, lon, city)
+    if cache_key:
+        with weather_cache_lock:
+            cached = weather_cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+    
+    if lat and lon:
+        url = f"{WEATHER_BASE_URL}/weather?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
+        application.logger.debug("📍 Using coordinates: %s, %s", lat, lon)
+    else:
+        url = f"{WEATHER_BASE_URL}/weather?q={city},IN&appid={WEATHER_API_KEY}&units=metric"
+        application.logger.debug("🏙️ Using city: %s", city)
+    
+    response = weather_session.get(url, timeout=10)
+    data = response.json()
+    
+    application.logger.debug("📊 API Response Status: %s", response.status_code)
+    
+    if response.status_code != 200:
+        application.logger.warning("❌ Weather API error: %s", data.get('message', 'Unknown error'))
+        return None, data.get('message', 'Weather data not found')
+    
+    application.logger.debug("✅ Weather data for: %s", data.get('name'))
+    if cache_key:
+        with weather_cache_lock:
+            weather_cache[cache_key] = data
+    return data, None
+
+def fetch_forecast(lat, lon):
+    """Next 24 hours of forecast from OpenWeatherMap or the cache; returns (data, error)"""
+    cache_key = weather_cache_key(lat, lon)
+    if cache_key:
+        with weather_cache_lock:
+            cached = forecast_cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+    
+    url = f"{WEATHER_BASE_URL}/forecast?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
+    response = weather_session.get(url, timeout=10)
+    data = response.json()
+    
+    if response.status_code != 200:
+        return None, 'Forecast data not found'
+    
+    forecast_list = []
+    for item in data['list'][:8]:  # Next 24 hours (3-hour intervals)
+        forecast_list.append({
+            'time': item['dt_txt'],
+            'temperature': item['main']['temp'],
+            'description': item['weather'][0]['description'],
+            'icon': item['weather'][0]['icon']
+        })
+    
+    if cache_key:
+        with weather_cache_lock:
+            forecast_cache[cache_key] = forecast_list
+    return forecast_list, None
+
 @application.route('/api/weather', methods=['GET'])
 def get_weather():
     try:
@@ -410,35 +810,22 @@ def get_weather():
         lon = request.args.get('lon')
         city = request.args.get('city')
         
-        print(f"🌍 Weather request - Lat: {lat}, Lon: {lon}, City: {city}")
+        app.logger.debug("🌍 Weather request - Lat: %s, Lon: %s, City: %s", lat, lon, city)
         
-        if lat and lon:
-            url = f"{WEATHER_BASE_URL}/weather?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
-            print(f"📍 Using coordinates: {lat}, {lon}")
-        elif city:
-            url = f"{WEATHER_BASE_URL}/weather?q={city},IN&appid={WEATHER_API_KEY}&units=metric"
-            print(f"🏙️ Using city: {city}")
-        else:
+        if not (lat and lon) and not city:
             return jsonify({'success': False, 'message': 'Location required'}), 400
         
-        print(f"🌐 API URL: {url}")
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        
-        print(f"📊 API Response Status: {response.status_code}")
+        data, error = fetch_current_weather(lat, lon, city)
+        if error:
+            return jsonify({'success': False, 'message': error}), 404
         
-        if response.status_code == 200:
-            # Return the full OpenWeatherMap response JSON so the frontend
-            # display functions (which expect fields like `main`, `weather`,
-            # `sys`, etc.) can use it directly.
-            print(f"✅ Weather data for: {data.get('name')}, {data.get('sys', {}).get('country')}")
-            return jsonify({'success': True, 'data': data})
-        else:
-            print(f"❌ Weather API error: {data.get('message', 'Unknown error')}")
-            return jsonify({'success': False, 'message': data.get('message', 'Weather data not found')}), 404
+        # Return the full OpenWeatherMap response JSON so the frontend
+        # display functions (which expect fields like `main`, `weather`,
+        # `sys`, etc.) can use it directly.
+        return jsonify({'success': True, 'data': data})
             
     except Exception as e:
-        print(f"❌ Weather exception: {str(e)}")
+        app.logger.error("❌ Weather exception: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @application.route('/api/weather/forecast', methods=['GET'])
@@ -450,41 +837,145 @@ def get_forecast():
         if not lat or not lon:
             return jsonify({'success': False, 'message': 'Location required'}), 400
         
-        url = f"{WEATHER_BASE_URL}/forecast?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
-        response = requests.get(url)
-        data = response.json()
-        
-        if response.status_code == 200:
-            forecast_list = []
-            for item in data['list'][:8]:  # Next 24 hours (3-hour intervals)
-                forecast_list.append({
-                    'time': item['dt_txt'],
-                    'temperature': item['main']['temp'],
-                    'description': item['weather'][0]['description'],
-                    'icon': item['weather'][0]['icon']
-                })
+        forecast_list, error = fetch_forecast(lat, lon)
+        if error:
+            return jsonify({'success': False, 'message': error}), 404
+        
+        return jsonify({'success': True, 'data': forecast_list})
             
-            return jsonify({'success': True, 'data': forecast_list})
-        else:
-            return jsonify({'success': False, 'message': 'Forecast data not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@application.route('/api/weather/full', methods=['GET'])
+def get_weather_full():
+    """Current weather and forecast in one response, fetched concurrently"""
+    try:
+        lat = request.args.get('lat')
+        lon = request.args.get('lon')
+        
+        if not lat or not lon:
+            return jsonify({'success': False, 'message': 'Location required'}), 400
+        
+        current_future = weather_executor.submit(fetch_current_weather, lat, lon)
+        forecast_future = weather_executor.submit(fetch_forecast, lat, lon)
+        current, current_error = current_future.result()
+        forecast_list, forecast_error = forecast_future.result()
+        
+        if current_error or forecast_error:
+            return jsonify({'success': False, 'message': current_error or forecast_error}), 404
+        
+        return jsonify({'success': True, 'data': {'current': current, 'forecast': forecast_list}})
             
     except Exception as e:
+        app.logger.error("❌ Weather exception: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def probe_fulltext_search():
+    """innodb_ft_min_token_size if the resource name FULLTEXT index exists, else None"""
+    if db.engine.dialect.name != 'mysql':
+        return None
+    try:
+        # Its own connection, so a failure can't disturb the request's session
+        with db.engine.connect() as connection:
+            has_index = connection.execute(db.text(
+                "SELECT 1 FROM information_schema.statistics"
+                " WHERE table_schema = DATABASE() AND table_name = 'resources'"
+                " AND index_name = 'ft_resource_name' AND index_type = 'FULLTEXT' LIMIT 1"
+            )).scalar()
+            if not has_index:
+                # Databases that haven't run migrate_db.py don't have it, and
+                # MATCH without one fails outright
+                application.logger.warning("FULLTEXT index ft_resource_name missing; searching with LIKE")
+                return None
+            return int(connection.execute(db.text("SELECT @@innodb_ft_min_token_size")).scalar())
+    except Exception as e:
+        application.logger.warning("FULLTEXT probe failed, searching with LIKE: %s", e)
+        return None
+
+# Probed on the first search rather than on every cold start, then kept
+fulltext_search = {}
+
+def fulltext_min_token_size():
+    if 'min_token_size' not in fulltext_search:
+        fulltext_search['min_token_size'] = probe_fulltext_search()
+    return fulltext_search['min_token_size']
+
+# Characters with a meaning in MySQL boolean-mode search, treated as separators
+FULLTEXT_OPERATORS = str.maketrans({char: ' ' for char in '+-<>()~*"@'})
+
+def fulltext_terms(search):
+    """Boolean-mode query requiring every word as a prefix, or None to fall back to LIKE"""
+    min_token_size = fulltext_min_token_size()
+    if min_token_size is None:
+        return None
+    words = search.translate(FULLTEXT_OPERATORS).split()
+    # Words shorter than the indexed token size would never match
+    if not words or any(len(word) < min_token_size for word in words):
+        return None
+    return ' '.join(f'+{word}*' for word in words)
+
+def encode_resource_cursor(created_at, resource_id):
+    """Opaque keyset cursor for the row a newest-first page ended on"""
+    # Rows without a timestamp sort last and get an empty one
+    return f"{created_at.isoformat() if created_at else ''}_{resource_id}"
+
+def after_resource_cursor(query, cursor):
+    """Restrict a newest-first query to rows after the cursor, or None if it is malformed"""
+    try:
+        created_at, resource_id = cursor.rsplit('_', 1)
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        resource_id = int(resource_id)
+    except ValueError:
+        return None
+    # NULL timestamps sort after every other row in a descending order
+    if created_at is None:
+        return query.filter(Resource.created_at.is_(None), Resource.id < resource_id)
+    return query.filter(or_(
+        Resource.created_at < created_at,
+        and_(Resource.created_at == created_at, Resource.id < resource_id),
+        Resource.created_at.is_(None)
+    ))
+
 @application.route('/api/resources', methods=['GET'])
 def get_resources():
     try:
         category = request.args.get('category')
         sort_by = request.args.get('sort', 'newest')
         search = request.args.get('search', '')
+        page = request.args.get('page', 1, type=int)
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+        cursor = request.args.get('cursor')
         
-        query = Resource.query.filter_by(is_available=True)
+        # Select only the columns the listing needs, with the owner joined in,
+        # instead of hydrating full ORM objects
+        query = db.session.query(
+            Resource.id,
+            Resource.name,
+            Resource.category,
+            Resource.description,
+            Resource.price,
+            Resource.listing_type,
+            Resource.condition,
+            Resource.age_years,
+            Resource.quality,
+            Resource.image_url,
+            Resource.rating,
+            Resource.created_at,
+            User.name.label('owner_name'),
+            User.phone.label('owner_phone'),
+            User.location.label('owner_location')
+        ).join(User, User.id == Resource.owner_id).filter(Resource.is_available == True)
         
         if category and category != 'all':
-            query = query.filter_by(category=category)
+            query = query.filter(Resource.category == category)
         
         if search:
-            query = query.filter(Resource.name.ilike(f'%{search}%'))
+            # On MySQL use the FULLTEXT index, requiring a prefix match on every word
+            terms = fulltext_terms(search)
+            if terms:
+                query = query.filter(Resource.name.match(terms))
+            else:
+                query = query.filter(Resource.name.ilike(f'%{search}%'))
         
         # Sorting
         if sort_by == 'price_low':
@@ -494,44 +985,58 @@ def get_resources():
         elif sort_by == 'rating':
             query = query.order_by(Resource.rating.desc())
         else:  # newest
-            query = query.order_by(Resource.created_at.desc())
+            query = query.order_by(Resource.created_at.desc(), Resource.id.desc())
         
-        resources = query.all()
+        if cursor and sort_by == 'newest':
+            # Keyset pagination: seek past the cursor on the index instead of
+            # counting and skipping OFFSET rows
+            query = after_resource_cursor(query, cursor)
+            if query is None:
+                return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+            rows = query.limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            response = {'success': True}
+        else:
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            rows = pagination.items
+            has_more = pagination.has_next
+            response = {
+                'success': True,
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'total': pagination.total
+            }
         
         resources_list = []
-        for resource in resources:
-            owner = User.query.get(resource.owner_id)
-            # Validate and set fallback for image URL
-            image_url = resource.image_url
-            if not image_url or not image_url.strip():
-                image_url = '/static/images/placeholder.svg'
-            elif image_url.startswith('/static/'):
-                # For local files, check if they exist
-                file_path = os.path.join(application.root_path, image_url.lstrip('/'))
-                if not os.path.exists(file_path):
-                    image_url = '/static/images/placeholder.svg'
-            
+        for row in rows:
             resources_list.append({
-                'id': resource.id,
-                'name': resource.name,
-                'category': resource.category,
-                'description': resource.description,
-                'price': resource.price,
-                'listing_type': resource.listing_type,
-                'condition': resource.condition,
-                'age_years': resource.age_years,
-                'quality': resource.quality,
-                'image_url': image_url,
-                'rating': resource.rating,
+                'id': row.id,
+                'name': row.name,
+                'category': row.category,
+                'description': row.description,
+                'price': row.price,
+                'listing_type': row.listing_type,
+                'condition': row.condition,
+                'age_years': row.age_years,
+                'quality': row.quality,
+                'image_url': resolve_image_url(row.image_url),
+                'rating': row.rating,
                 'owner': {
-                    'name': owner.name,
-                    'phone': owner.phone,
-                    'location': owner.location
+                    'name': row.owner_name,
+                    'phone': row.owner_phone,
+                    'location': row.owner_location
                 },
-                'created_at': resource.created_at.isoformat()
+                'created_at': row.created_at
             })
         
-        return jsonify({'success': True, 'data': resources_list})
+        response['data'] = resources_list
+        # Newest-first pages hand back a cursor for fetching the next page
+        response['next_cursor'] = None
+        if has_more and sort_by == 'newest':
+            response['next_cursor'] = encode_resource_cursor(rows[-1].created_at, rows[-1].id)
+        
+        return ojsonify(response)
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -540,127 +1045,253 @@ def get_resources():
 @login_required
 def get_my_resources():
     try:
-        resources = Resource.query.filter_by(owner_id=session['user_id']).all()
+        per_page = max(1, min(request.args.get('per_page', 50, type=int), 100))
+        cursor = request.args.get('cursor')
         
-        resources_list = []
-        for resource in resources:
-            resources_list.append({
-                'id': resource.id,
-                'name': resource.name,
-                'category': resource.category,
-                'description': resource.description,
-                'price': resource.price,
-                'listing_type': resource.listing_type,
-                'condition': resource.condition,
-                'is_available': resource.is_available,
-                'image_url': resource.image_url,
-                'rating': resource.rating,
-                'created_at': resource.created_at.isoformat()
-            })
+        # Only the columns the page shows, as plain rows rather than ORM objects
+        query = db.session.query(
+            Resource.id,
+            Resource.name,
+            Resource.category,
+            Resource.description,
+            Resource.price,
+            Resource.listing_type,
+            Resource.condition,
+            Resource.is_available,
+            Resource.image_url,
+            Resource.rating,
+            Resource.created_at
+        ).filter(Resource.owner_id == session['user_id']).order_by(
+            Resource.created_at.desc(), Resource.id.desc()
+        )
+        
+        response = {'success': True}
+        if cursor:
+            query = after_resource_cursor(query, cursor)
+            if query is None:
+                return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        else:
+            response['total'] = query.order_by(None).count()
+        
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
         
-        return jsonify({'success': True, 'data': resources_list})
+        response['data'] = [row._asdict() for row in rows]
+        response['next_cursor'] = None
+        if has_more:
+            response['next_cursor'] = encode_resource_cursor(rows[-1].created_at, rows[-1].id)
+        
+        return ojsonify(response)
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# Image types the browser may upload to S3 directly, with their key extensions
+PRESIGNED_IMAGE_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp'
+}
+# Presigned keys remembered per session; older ones can no longer be attached
+MAX_PRESIGNED_KEYS = 10
+
+def check_presigned_image(bucket, key):
+    """(message, status) if the directly uploaded object isn't an acceptable image, else None"""
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return 'Uploaded image not found', 400
+        raise
+    if head['ContentLength'] > application.config['MAX_CONTENT_LENGTH']:
+        return 'Image too large', 413
+    content_type = head.get('ContentType')
+    if content_type not in PRESIGNED_IMAGE_TYPES:
+        return 'Invalid file type. Only images are allowed.', 415
+    # Trust the object's magic bytes, not the Content-Type the browser sent
+    header = s3_client.get_object(Bucket=bucket, Key=key, Range='bytes=0-11')['Body'].read()
+    if sniff_image_type(io.BytesIO(header)) != content_type:
+        return 'Invalid file type. Only images are allowed.', 415
+    return None
+
+@application.route('/api/resources/presign', methods=['POST'])
+@login_required
+def presign_resource_image():
+    """Presigned S3 POST so the browser uploads the image without going through Flask"""
+    # Opt-in only: the add-resource page sends the file with the form, since a
+    # direct upload skips the WebP re-encode (and EXIF stripping) and the
+    # content-hash key
+    if not s3_client:
+        return jsonify({'success': False, 'message': 'Direct upload not available - S3 not configured'}), 503
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        content_type = data.get('content_type')
+        extension = PRESIGNED_IMAGE_TYPES.get(content_type)
+        if not extension:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid file type. Only images are allowed.'
+            }), 415
+        
+        bucket = os.getenv('S3_BUCKET')
+        key = f"{secrets.token_hex(16)}.{extension}"
+        fields = {
+            'Content-Type': content_type,
+            'Cache-Control': 'max-age=31536000'  # 1 year cache
+        }
+        # S3 enforces the size limit and headers, not the client
+        presigned = s3_client.generate_presigned_post(
+            bucket,
+            key,
+            Fields=fields,
+            Conditions=[
+                ['content-length-range', 1, application.config['MAX_CONTENT_LENGTH']],
+                {'Content-Type': content_type},
+                {'Cache-Control': fields['Cache-Control']}
+            ],
+            ExpiresIn=60
+        )
+        # Only keys issued to this session may be attached to a resource
+        session['presigned_keys'] = (session.get('presigned_keys', []) + [key])[-MAX_PRESIGNED_KEYS:]
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'url': presigned['url'],
+                'fields': presigned['fields'],
+                'image_url': s3_object_url(bucket, key)
+            }
+        })
+        
+    except Exception as e:
+        app.logger.error("❌ Presign error: %s", e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @application.route('/api/resources', methods=['POST'])
 @login_required
 def create_resource():
+    # Reject oversized uploads from the header, before any body bytes are parsed
+    if (request.content_length or 0) > application.config['MAX_CONTENT_LENGTH']:
+        raise RequestEntityTooLarge()
+    
     try:
         # Handle file upload
         image_url = '/static/images/placeholder.svg'
+        pending_s3_upload = None
         
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4()}_{filename}"
+                # Trust the file's magic bytes, not the client's filename or Content-Type
+                if not sniff_image_type(file.stream):
+                    return jsonify({
+                        'success': False,
+                        'message': 'Invalid file type. Only images are allowed.'
+                    }), 415
+                
+                # Store a downscaled WebP rather than the camera original
+                try:
+                    image_data = make_web_image(file.stream)
+                except (OSError, Image.DecompressionBombError):
+                    return jsonify({
+                        'success': False,
+                        'message': 'Invalid or corrupt image file.'
+                    }), 415
+                content_type = 'image/webp'
+                # Name files by content so identical images are stored once
+                unique_filename = hashlib.blake2b(image_data.getbuffer(), digest_size=16).hexdigest() + '.webp'
                 
                 # Check if we're on Vercel (or other cloud platform)
                 is_vercel = os.environ.get('VERCEL', False)
                 
-                if s3_client:
+                # Serverless instances are frozen after the response, so upload to S3 inline
+                if s3_client and is_vercel:
                     try:
-                        # Validate file size before upload
-                        file.seek(0, os.SEEK_END)
-                        size = file.tell()
-                        file.seek(0)
-                        
-                        if size > application.config['MAX_CONTENT_LENGTH']:
-                            return jsonify({
-                                'success': False,
-                                'message': f'File too large. Maximum size is {application.config["MAX_CONTENT_LENGTH"] / (1024 * 1024)}MB'
-                            }), 413
-
-                        # Validate content type
-                        content_type = file.content_type
-                        if not content_type.startswith('image/'):
-                            return jsonify({
-                                'success': False,
-                                'message': 'Invalid file type. Only images are allowed.'
-                            }), 415
-
-                        # Ensure the bucket exists
+                        # Oversized bodies were already rejected from Content-Length
                         bucket = os.getenv('S3_BUCKET')
-                        try:
-                            s3_client.head_bucket(Bucket=bucket)
-                        except:
-                            app.logger.error(f"S3 bucket {bucket} not found or not accessible")
+                        if s3_object_exists(bucket, unique_filename):
+                            # Keys are content hashes, so this image is already stored
+                            image_url = s3_object_url(bucket, unique_filename)
+                        else:
+                            # botocore retries transient failures with backoff
+                            s3_client.upload_fileobj(
+                                image_data,
+                                bucket,
+                                unique_filename,
+                                ExtraArgs={
+                                    'ContentType': content_type,
+                                    'CacheControl': 'max-age=31536000'  # 1 year cache
+                                }
+                            )
+                            s3_url = s3_object_url(bucket, unique_filename)
+                            image_url = s3_url
+                            app.logger.info("✅ Image uploaded to S3: %s", s3_url)
+                                
+                    except S3UploadFailedError as e:
+                        app.logger.error("❌ S3 upload failed: %s", e)
+                        return jsonify({
+                            'success': False,
+                            'message': 'Failed to upload image'
+                        }), 500
+                    except ClientError as e:
+                        # A missing or forbidden bucket surfaces on the first request
+                        # instead of being probed for on every upload
+                        if e.response['Error']['Code'] in ('NoSuchBucket', 'AccessDenied', '403'):
+                            app.logger.error("S3 bucket %s not found or not accessible: %s", bucket, e)
                             return jsonify({
                                 'success': False,
                                 'message': 'Storage configuration error'
                             }), 500
-
-                        # Upload with retry
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                s3_client.upload_fileobj(
-                                    file,
-                                    bucket,
-                                    unique_filename,
-                                    ExtraArgs={
-                                        'ContentType': content_type,
-                                        'CacheControl': 'max-age=31536000'  # 1 year cache
-                                    }
-                                )
-                                s3_url = f"https://{bucket}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{unique_filename}"
-                                image_url = s3_url
-                                app.logger.info(f"✅ Image uploaded to S3: {s3_url}")
-                                break
-                            except Exception as e:
-                                if attempt == max_retries - 1:
-                                    app.logger.error(f"❌ S3 upload failed after {max_retries} attempts: {str(e)}")
-                                    return jsonify({
-                                        'success': False,
-                                        'message': 'Failed to upload image'
-                                    }), 500
-                                app.logger.warning(f"⚠️ S3 upload attempt {attempt + 1} failed: {str(e)}")
-                                time.sleep(1)  # Wait before retry
-                                
+                        app.logger.error("❌ S3 upload error: %s", e)
+                        return jsonify({
+                            'success': False,
+                            'message': 'Failed to process image upload'
+                        }), 500
                     except Exception as e:
-                        app.logger.error(f"❌ S3 upload error: {str(e)}")
+                        app.logger.error("❌ S3 upload error: %s", e)
                         return jsonify({
                             'success': False,
                             'message': 'Failed to process image upload'
                         }), 500
                 
-                # Only try local storage if we're not on Vercel and S3 upload failed
+                # Elsewhere save locally and, with S3 configured, upload once the
+                # resource is committed so the response doesn't wait on S3
                 elif not is_vercel:
                     try:
                         os.makedirs(application.config['UPLOAD_FOLDER'], exist_ok=True)
                         filepath = os.path.join(application.config['UPLOAD_FOLDER'], unique_filename)
-                        file.save(filepath)
+                        if not os.path.exists(filepath):
+                            with open(filepath, 'wb') as f:
+                                f.write(image_data.getbuffer())
                         image_url = f"/static/uploads/{unique_filename}"
-                        print(f"✅ Image saved locally: {image_url}")
+                        static_files().add(image_url)
+                        app.logger.info("✅ Image saved locally: %s", image_url)
+                        if s3_client:
+                            pending_s3_upload = (filepath, unique_filename)
                     except Exception as e:
-                        print(f"❌ Local save failed: {e}")
+                        app.logger.error("❌ Local save failed: %s", e)
                         return jsonify({'success': False, 'message': 'Failed to save image'}), 500
                 else:
                     # We're on Vercel but S3 isn't configured
                     return jsonify({'success': False, 'message': 'Image upload not available - S3 not configured'}), 500
             else:
-                print(f"⚠️ No valid image file provided or invalid file type")
+                app.logger.debug("⚠️ No valid image file provided or invalid file type")
+        elif s3_client and request.form.get('image_url'):
+            # The browser already uploaded the image through a presigned POST
+            bucket = os.getenv('S3_BUCKET')
+            prefix = s3_object_url(bucket, '')
+            key = request.form['image_url'][len(prefix):]
+            if not request.form['image_url'].startswith(prefix) or key not in session.get('presigned_keys', []):
+                return jsonify({'success': False, 'message': 'Unknown image upload'}), 400
+            rejection = check_presigned_image(bucket, key)
+            if rejection:
+                message, status = rejection
+                return jsonify({'success': False, 'message': message}), status
+            session['presigned_keys'] = [k for k in session['presigned_keys'] if k != key]
+            image_url = s3_object_url(bucket, key)
         
         # Validate image URL before creating resource
         if not image_url or not isinstance(image_url, str) or not image_url.strip():
@@ -684,122 +1315,129 @@ def create_resource():
         )
         
         db.session.add(resource)
+        # Commit before responding: the background upload updates this row
+        # from its own session
         db.session.commit()
+        resource_id = resource.id
+        
+        if pending_s3_upload:
+            s3_upload_executor.submit(upload_image_to_s3, *pending_s3_upload)
         
         return jsonify({
             'success': True,
             'message': 'Resource added successfully',
-            'resource_id': resource.id
+            'resource_id': resource_id
         })
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def version_etag(*versions):
+    """Weak ETag for a response that depends only on the given row versions"""
+    return hashlib.blake2b(repr(versions).encode(), digest_size=8).hexdigest()
+
+def not_modified(etag):
+    """A 304 if the client already holds this ETag, else None"""
+    # Flask-Compress appends the encoding to the ETags it sends, so the
+    # client may echo back any of those variants
+    candidates = [etag] + [f"{etag}:{algorithm}" for algorithm in application.config['COMPRESS_ALGORITHM']]
+    if not any(request.if_none_match.contains_weak(candidate) for candidate in candidates):
+        return None
+    response = application.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+# Serialised detail responses keyed by the resource and owner versions they show
+resource_detail_cache = LRUCache(maxsize=2048)
+resource_detail_cache_lock = threading.Lock()
+
 @application.route('/api/resources/<int:resource_id>', methods=['GET'])
 def get_resource_detail(resource_id):
     try:
-        resource = Resource.query.get(resource_id)
+        # Load the owner in the same SELECT instead of a second lookup
+        resource = db.session.get(Resource, resource_id, options=[joinedload(Resource.owner)])
         
         if not resource:
-            return jsonify({'success': False, 'message': 'Resource not found'}), 404
+            return ojsonify({'success': False, 'message': 'Resource not found'}, 404)
         
-        # Get owner information
-        owner = User.query.get(resource.owner_id)
+        # Both rows bump updated_at on every write, so an unchanged pair of
+        # versions can reuse the response body built for it. The image URL
+        # depends on the static listing rather than the rows, so it is part
+        # of the key instead of being frozen into the cached body
+        owner = resource.owner
+        image_url = resolve_image_url(resource.image_url)
+        cache_key = (resource.id, resource.updated_at, owner.updated_at, image_url)
+        etag = version_etag(*cache_key)
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
         
-        # Validate image URL
-        image_url = resource.image_url
-        if not image_url or not isinstance(image_url, str) or not image_url.strip():
-            image_url = '/static/images/placeholder.svg'
-        elif image_url.startswith('/static/'):
-            file_path = os.path.join(application.root_path, image_url.lstrip('/'))
-            if not os.path.exists(file_path):
-                image_url = '/static/images/placeholder.svg'
-        
-        resource_data = {
-            'id': resource.id,
-            'name': resource.name,
-            'description': resource.description,
-            'category': resource.category,
-            'listing_type': resource.listing_type,
-            'price': float(resource.price),
-            'condition': resource.condition,
-            'age': resource.age_years,
-            'quality': resource.quality,
-            'location': resource.location,
-            'image_url': image_url,
-            'is_available': resource.is_available,
-            'created_at': resource.created_at.isoformat() if resource.created_at else None,
-            'owner': {
-                'name': owner.name if owner else 'Owner',
-                'email': owner.email if owner else '',
-                'phone': owner.phone if owner else '',
-                'location': owner.location if owner else ''
-            }
-        }
+        with resource_detail_cache_lock:
+            body = resource_detail_cache.get(cache_key)
+        if body is None:
+            resource_data = resource.to_dict()
+            resource_data['image_url'] = image_url
+            body = orjson.dumps({'success': True, 'data': resource_data}, option=orjson.OPT_NON_STR_KEYS)
+            with resource_detail_cache_lock:
+                resource_detail_cache[cache_key] = body
         
-        return jsonify({'success': True, 'data': resource_data})
+        response = application.response_class(body, mimetype='application/json')
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True  # Always revalidate, cheaply
+        return response
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @application.route('/api/resources/<int:resource_id>', methods=['PUT'])
 @login_required
 def update_resource(resource_id):
     try:
-        resource = Resource.query.get(resource_id)
+        user_id = session['user_id']
+        data = request.get_json(silent=True) or {}
+        fields = {k: data[k] for k in ('is_available', 'price', 'description') if k in data}
         
-        if not resource:
-            return jsonify({'success': False, 'message': 'Resource not found'}), 404
-        
-        if resource.owner_id != session['user_id']:
-            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-        
-        data = request.json
-        
-        if 'is_available' in data:
-            resource.is_available = data['is_available']
-        if 'price' in data:
-            resource.price = data['price']
-        if 'description' in data:
-            resource.description = data['description']
+        # Ownership is part of the WHERE clause, so the check and the write are one statement
+        query = Resource.query.filter_by(id=resource_id, owner_id=user_id)
+        # Committed by commit_session once the response is ready
+        updated = query.update(fields, synchronize_session=False) if fields else query.count()
         
-        db.session.commit()
+        if not updated:
+            return ojsonify({'success': False, 'message': 'Resource not found'}, 404)
         
-        return jsonify({'success': True, 'message': 'Resource updated successfully'})
+        return ojsonify({'success': True, 'message': 'Resource updated successfully'})
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @application.route('/api/resources/<int:resource_id>', methods=['DELETE'])
 @login_required
 def delete_resource(resource_id):
     try:
-        resource = Resource.query.get(resource_id)
+        # Committed by commit_session once the response is ready
+        deleted = Resource.query.filter_by(id=resource_id, owner_id=session['user_id']).delete(synchronize_session=False)
         
-        if not resource:
-            return jsonify({'success': False, 'message': 'Resource not found'}), 404
+        if not deleted:
+            return ojsonify({'success': False, 'message': 'Resource not found'}, 404)
         
-        if resource.owner_id != session['user_id']:
-            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-        
-        db.session.delete(resource)
-        db.session.commit()
-        
-        return jsonify({'success': True, 'message': 'Resource deleted successfully'})
+        return ojsonify({'success': True, 'message': 'Resource deleted successfully'})
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @application.route('/api/user/profile', methods=['GET'])
 @login_required
 def get_profile():
     try:
-        user = User.query.get(session['user_id'])
+        user = get_user(session['user_id'])
         
-        return jsonify({
+        etag = version_etag(user.id, user.updated_at)
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+        
+        response = ojsonify({
             'success': True,
             'data': {
                 'id': user.id,
@@ -808,36 +1446,42 @@ def get_profile():
                 'phone': user.phone,
                 'location': user.location,
                 'language_preference': user.language_preference,
-                'created_at': user.created_at.isoformat()
+                'created_at': user.created_at
             }
         })
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @application.route('/api/user/profile', methods=['PUT'])
 @login_required
 def update_profile():
     try:
-        user = User.query.get(session['user_id'])
-        data = request.json
+        user_id = session['user_id']
+        data = request.get_json(silent=True) or {}
+        fields = {k: data[k] for k in ('name', 'phone', 'location', 'language_preference') if k in data}
         
-        if 'name' in data:
-            user.name = data['name']
-        if 'phone' in data:
-            user.phone = data['phone']
-        if 'location' in data:
-            user.location = data['location']
-        if 'language_preference' in data:
-            user.language_preference = data['language_preference']
+        # One UPDATE statement, without loading the row first
+        if fields:
+            result = db.session.execute(db.update(User).where(User.id == user_id).values(**fields))
+            # Commit before dropping the cached snapshot so it can't be refilled
+            # from the old row
+            db.session.commit()
+            if not result.rowcount:
+                return ojsonify({'success': False, 'message': 'User not found'}, 404)
+            if 'name' in fields:
+                session['user_name'] = fields['name']
+            forget_user(user_id)
         
-        db.session.commit()
-        
-        return jsonify({'success': True, 'message': 'Profile updated successfully'})
+        return ojsonify({'success': True, 'message': 'Profile updated successfully'})
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 
 app = application  # Vercel entry point
@@ -1,61 +1,84 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import now
 from datetime import datetime
-import time
 import os
 
 db = SQLAlchemy()
 
+# Row version timestamps; MySQL's DATETIME drops fractional seconds unless
+# asked, which would give two writes in the same second the same version
+VersionTimestamp = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+@compiles(now, 'sqlite')
+def sqlite_now(element, compiler, **kw):
+    # SQLite stores DateTime as text; write defaults in the same format
+    # SQLAlchemy binds, so they compare correctly with datetime parameters
+    return "(STRFTIME('%Y-%m-%d %H:%M:%f000', 'now'))"
+
 def init_db(app):
+    if not app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite'):
+        # Baseline pool for RDS when the app hasn't tuned its own; recycle below
+        # the server's idle timeout and drop connections that went stale
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+            'connect_args': {'connect_timeout': 5}
+        })
     db.init_app(app)
-    max_retries = 5
-    retry_delay = 2  # seconds
     
     with app.app_context():
-        # Test the database connection with retries
-        for attempt in range(max_retries):
-            try:
-                with db.engine.connect() as connection:
-                    # Test query to ensure connection is working
-                    connection.execute(db.text("SELECT 1"))
-                    print(f"\n✅ Database connection successful (attempt {attempt + 1}/{max_retries}).\n")
-                    break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"\n⚠️ Database connection attempt {attempt + 1}/{max_retries} failed.")
-                    print(f"   Error: {str(e)}")
-                    print(f"   Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    print("\n" + "="*60)
-                    print("❌ AWS RDS DATABASE CONNECTION FAILED!")
-                    print(f"   Error: {str(e)}")
-                    print("   Please check the following:")
-                    print("     1. The `DATABASE_URL` in your .env file is correct.")
-                    print("     2. The RDS instance is running and accessible.")
-                    print("     3. The security groups for your RDS instance allow connections from your IP.")
-                    print("     4. The database server is not at maximum connections.")
-                    print("="*60 + "\n")
-                    if app.config.get('TESTING') or os.environ.get('VERCEL'):
-                        raise  # Re-raise in testing/production environments
-                    else:
-                        # In development, fall back to SQLite
-                        print("\n⚠️ Falling back to SQLite database for development.\n")
-                        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dev.db'
-                        db.init_app(app)
-                        with app.app_context():
-                            db.create_all()
-                        return
-                    
+        # Probe once; the driver's connect_timeout bounds how long this can block
         try:
-            # Create tables with proper error handling
-            db.create_all()
-            print("✅ Database tables created/verified successfully")
+            connection = db.engine.connect()
+            # Test query to ensure connection is working
+            connection.execute(db.text("SELECT 1"))
+            print("\n✅ Database connection successful.\n")
         except Exception as e:
-            print("❌ Failed to create/verify database tables")
+            print("\n" + "="*60)
+            print("❌ AWS RDS DATABASE CONNECTION FAILED!")
             print(f"   Error: {str(e)}")
+            print("   Please check the following:")
+            print("     1. The `DATABASE_URL` in your .env file is correct.")
+            print("     2. The RDS instance is running and accessible.")
+            print("     3. The security groups for your RDS instance allow connections from your IP.")
+            print("     4. The database server is not at maximum connections.")
+            print("="*60 + "\n")
             if app.config.get('TESTING') or os.environ.get('VERCEL'):
                 raise  # Re-raise in testing/production environments
+            
+            # In development, fall back to SQLite, re-registering the extension
+            # so it builds a fresh engine without the server pool options
+            print("\n⚠️ Falling back to SQLite database for development.\n")
+            db.engine.dispose()
+            app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dev.db'
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+            app.extensions.pop('sqlalchemy')
+            db.init_app(app)
+            db.create_all()
+            return
+        
+        # Migrations own the schema when SCHEMA_MANAGED is set, so skip the
+        # per-table introspection on every cold start
+        if os.environ.get('SCHEMA_MANAGED'):
+            connection.close()
+            return
+        
+        with connection:
+            try:
+                # Create tables on the connection that was just verified
+                db.metadata.create_all(connection)
+                connection.commit()
+                print("✅ Database tables created/verified successfully")
+            except Exception as e:
+                print("❌ Failed to create/verify database tables")
+                print(f"   Error: {str(e)}")
+                if app.config.get('TESTING') or os.environ.get('VERCEL'):
+                    raise  # Re-raise in testing/production environments
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -67,18 +90,34 @@ class User(db.Model):
     phone = db.Column(db.String(20))
     location = db.Column(db.String(200))
     language_preference = db.Column(db.String(10), default='en')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(VersionTimestamp, server_default=db.func.now(6), onupdate=datetime.utcnow)
     
     # Relationships
-    resources = db.relationship('Resource', backref='owner', lazy=True, cascade='all, delete-orphan')
-    transactions = db.relationship('Transaction', backref='user', lazy=True)
+    # Collections refuse to lazy-load; queries must ask for them with
+    # selectinload(User.resources) etc., so an N+1 fails loudly
+    resources = db.relationship('Resource', back_populates='owner', lazy='raise_on_sql', cascade='all, delete-orphan')
+    transactions = db.relationship('Transaction', back_populates='user', lazy='raise_on_sql')
     
     def __repr__(self):
         return f'<User {self.email}>'
 
 class Resource(db.Model):
     __tablename__ = 'resources'
+    __table_args__ = (
+        # Marketplace listing: filter on availability/category, sort by date, price or rating
+        db.Index('ix_resource_avail_cat_created', 'is_available', 'category', 'created_at'),
+        db.Index('ix_resource_avail_cat_price', 'is_available', 'category', 'price'),
+        db.Index('ix_resource_avail_cat_rating', 'is_available', 'category', 'rating'),
+        # The same sorts across all categories
+        db.Index('ix_resource_avail_created', 'is_available', 'created_at'),
+        db.Index('ix_resource_avail_price', 'is_available', 'price'),
+        db.Index('ix_resource_avail_rating', 'is_available', 'rating'),
+        # An owner's own listings, newest first (also serves the owner_id FK)
+        db.Index('ix_resource_owner_created', 'owner_id', 'created_at'),
+        # Name search (MATCH ... AGAINST on MySQL, plain index elsewhere)
+        db.Index('ft_resource_name', 'name', mysql_prefix='FULLTEXT'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -94,12 +133,39 @@ class Resource(db.Model):
     location = db.Column(db.String(200))
     is_available = db.Column(db.Boolean, default=True)
     rating = db.Column(db.Float, default=0.0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(VersionTimestamp, server_default=db.func.now(6), onupdate=datetime.utcnow)
     
     # Relationships
+    owner = db.relationship('User', back_populates='resources')
     transactions = db.relationship('Transaction', backref='resource', lazy=True)
     
+    def to_dict(self):
+        """Detail representation, including the owner's contact details"""
+        owner = self.owner
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'category': self.category,
+            'listing_type': self.listing_type,
+            'price': float(self.price),
+            'condition': self.condition,
+            'age': self.age_years,
+            'quality': self.quality,
+            'location': self.location,
+            'image_url': self.image_url,
+            'is_available': self.is_available,
+            'created_at': self.created_at,
+            # owner_id is NOT NULL, so every resource has an owner
+            'owner': {
+                'name': owner.name,
+                'email': owner.email,
+                'phone': owner.phone,
+                'location': owner.location
+            }
+        }
+    
     def __repr__(self):
         return f'<Resource {self.name}>'
 
@@ -110,13 +176,16 @@ class Transaction(db.Model):
     resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     transaction_type = db.Column(db.String(20), nullable=False)  # rent, borrow, buy
-    start_date = db.Column(db.DateTime, default=datetime.utcnow)
+    start_date = db.Column(db.DateTime, server_default=db.func.now())
     end_date = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='pending')  # pending, active, completed, cancelled
     amount = db.Column(db.Float)
     rating = db.Column(db.Integer)  # 1-5 stars
     review = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    # Relationships
+    user = db.relationship('User', back_populates='transactions')
     
     def __repr__(self):
         return f'<Transaction {self.id}>'
@@ -0,0 +1,95 @@
+"""One-off upgrade of a MySQL database created by an older version of the app.
+
+create_all only creates missing tables, so columns and indexes that changed on
+existing tables are brought up to the models here. Without the indexes,
+listings fall back to full scans and name search to LIKE. Run it once per
+database before deploying (python migrate_db.py); every step is skipped when
+already applied, so running it again is harmless.
+"""
+import os
+import sys
+from urllib.parse import quote_plus
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from database import db
+
+load_dotenv()
+
+def database_url():
+    """The same DATABASE_URL / DB_* settings the application reads"""
+    db_url = os.getenv('DATABASE_URL')
+    if db_url:
+        return db_url
+    db_user = os.getenv('DB_USER')
+    db_password = os.getenv('DB_PASS') or os.getenv('DB_PASSWORD')
+    db_host = os.getenv('DB_HOST')
+    db_name = os.getenv('DB_NAME')
+    db_port = os.getenv('DB_PORT', '3306')
+    if all([db_user, db_password, db_host, db_name]):
+        return f"mysql+pymysql://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
+    return None
+
+def column_info(connection, table, column, field):
+    return connection.execute(text(
+        f"SELECT {field} FROM information_schema.columns"
+        " WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column"
+    ), {'table': table, 'column': column}).scalar()
+
+def upgrade_timestamp_defaults(connection):
+    """Let the database fill in timestamps the app used to set itself"""
+    # Rows written while a column had no default are backfilled from the
+    # closest existing timestamp, not from now, so they keep their place
+    # in newest-first listings
+    backfills = (
+        ('users', 'created_at', 'updated_at'),
+        ('resources', 'created_at', 'updated_at'),
+        ('transactions', 'start_date', 'created_at'),
+        ('transactions', 'created_at', 'start_date'),
+    )
+    for table, column, fallback in backfills:
+        if column_info(connection, table, column, 'column_default') is None:
+            print(f"   {table}.{column}: DEFAULT CURRENT_TIMESTAMP")
+            connection.execute(text(
+                f"ALTER TABLE {table} MODIFY {column} DATETIME NULL DEFAULT CURRENT_TIMESTAMP"
+            ))
+        connection.execute(text(f"UPDATE {table} SET {column} = {fallback} WHERE {column} IS NULL"))
+
+def upgrade_version_timestamps(connection):
+    """Microsecond updated_at, so two writes in one second are distinct versions"""
+    for table in ('users', 'resources'):
+        if column_info(connection, table, 'updated_at', 'datetime_precision') == 0:
+            print(f"   {table}.updated_at: DATETIME(6)")
+            connection.execute(text(
+                f"ALTER TABLE {table} MODIFY updated_at DATETIME(6) NULL DEFAULT CURRENT_TIMESTAMP(6)"
+            ))
+
+def create_missing_indexes(connection):
+    """Indexes declared on the models (listing sorts, name FULLTEXT) that the tables lack"""
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            exists = connection.execute(text(
+                "SELECT 1 FROM information_schema.statistics"
+                " WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index LIMIT 1"
+            ), {'table': table.name, 'index': index.name}).scalar()
+            if not exists:
+                print(f"   {table.name}: index {index.name}")
+                index.create(connection)
+
+if __name__ == "__main__":
+    db_url = database_url()
+    if not db_url:
+        print("❌ DATABASE_URL not found in .env file")
+        sys.exit(1)
+
+    engine = create_engine(db_url)
+    if engine.dialect.name != 'mysql':
+        print("✅ Nothing to migrate: create_all builds non-MySQL databases from the models")
+        sys.exit(0)
+
+    print("🔍 Upgrading database schema...")
+    # MySQL commits each ALTER on its own; the backfills commit at the end
+    with engine.begin() as connection:
+        upgrade_timestamp_defaults(connection)
+        upgrade_version_timestamps(connection)
+        create_missing_indexes(connection)
+    print("✅ Database schema is up to date")
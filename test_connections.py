@@ -1,9 +1,8 @@
+import io
 import os
 import sys
-import boto3
-import firebase_admin
-from firebase_admin import credentials, auth
-from sqlalchemy import create_engine, text
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 print("="*50)
@@ -16,6 +15,7 @@ load_dotenv()
 def test_database_connection():
     print("\n🔍 Testing Database Connection...")
     try:
+        from sqlalchemy import create_engine, text
         db_url = os.getenv('DATABASE_URL')
         if not db_url:
             print("❌ DATABASE_URL not found in .env file")
@@ -34,6 +34,7 @@ def test_database_connection():
 def test_s3_connection():
     print("\n🔍 Testing S3 Connection...")
     try:
+        import boto3
         s3 = boto3.client(
             's3',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
@@ -64,6 +65,8 @@ def test_s3_connection():
 def test_firebase_connection():
     print("\n🔍 Testing Firebase Connection...")
     try:
+        import firebase_admin
+        from firebase_admin import credentials
         # Check if Firebase is already initialized
         try:
             firebase_admin.get_app()
@@ -93,9 +96,15 @@ def test_weather_api():
     
     try:
         import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        # Same retrying transport as the app's weather client
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(max_retries=Retry(total=2, backoff_factor=0.2)))
         # Test with a known location (London)
-        response = requests.get(
-            f"https://api.openweathermap.org/data/2.5/weather?q=London&appid={api_key}&units=metric"
+        response = session.get(
+            f"https://api.openweathermap.org/data/2.5/weather?q=London&appid={api_key}&units=metric",
+            timeout=(3.05, 10)
         )
         if response.status_code == 200:
             print("✅ Weather API connection successful")
@@ -107,12 +116,40 @@ def test_weather_api():
         print(f"❌ Weather API connection failed: {str(e)}")
         return False
 
+class ThreadLocalStdout:
+    """stdout that each thread can divert into its own buffer"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        return getattr(self.local, 'buffer', self.stream).write(text)
+
+    def flush(self):
+        getattr(self.local, 'buffer', self.stream).flush()
+
+def run_captured(check):
+    """Run a check with its output buffered, returning (result, output)"""
+    sys.stdout.local.buffer = io.StringIO()
+    try:
+        return check(), sys.stdout.local.buffer.getvalue()
+    finally:
+        del sys.stdout.local.buffer
+
 if __name__ == "__main__":
-    # Test all connections
-    db_ok = test_database_connection()
-    s3_ok = test_s3_connection()
-    firebase_ok = test_firebase_connection()
-    weather_ok = test_weather_api()
+    # Test all connections in parallel; each waits on its own network round trips
+    sys.stdout = ThreadLocalStdout(sys.stdout)
+    checks = [test_database_connection, test_s3_connection, test_firebase_connection, test_weather_api]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = [executor.submit(run_captured, check) for check in checks]
+    
+    # Print each check's output in order, as if they had run one after another
+    results = []
+    for future in futures:
+        ok, output = future.result()
+        print(output, end='')
+        results.append(ok)
+    db_ok, s3_ok, firebase_ok, weather_ok = results
     
     # Print summary
     print("\n" + "="*50)